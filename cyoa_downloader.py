@@ -9,6 +9,12 @@ from urllib.parse import urlparse, urljoin, urlunparse, unquote
 from typing import Optional, List, Tuple
 import mimetypes
 import base64
+import binascii
+import hashlib
+import json
+import zlib
+import struct
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 import uuid
 import zipfile
@@ -18,6 +24,11 @@ import argparse
 import tldextract
 import time
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Set up logging
 logger = logging.getLogger("cyoa_downloader")
 handler = logging.StreamHandler()
@@ -36,6 +47,7 @@ def main() -> None:
     parser.add_argument("-z", "--zip", action="store_true", help="Zip the output folder.")
     parser.add_argument("-b", "--both", action="store_true", help="Create both embedded json and zip file")
     parser.add_argument("-w",'--wait-time', type=int, default=60,help='Wait time in seconds before retrying after a 429 response (default: 60)' )
+    parser.add_argument("-m", "--minify", action="store_true", help="Minify the project json. With embedded json output (default or -b), also write precompressed .json.gz and .json.br copies.")
     args = parser.parse_args()
 
     wait_time = args.wait_time
@@ -44,11 +56,13 @@ def main() -> None:
     file_name = args.filename
     zip_output = args.zip
     both_output = args.both
+    minify_output = args.minify
 
     logger.info(f"URL: {url}")
     logger.info(f"Filename: {file_name if file_name else '[auto-generated]'}")
     logger.info(f"Zip output enabled: {'Yes' if zip_output else 'No'}")
     logger.info(f"Both outputs enabled: {'Yes' if both_output else 'No'}")
+    logger.info(f"Minified output enabled: {'Yes' if minify_output else 'No'}")
 
     
     if zip_output:
@@ -85,11 +99,20 @@ def main() -> None:
 
     embed_result, download_result = process_images(cleaned_project_source, base_url, embed=embed_images, download=zip_output, temp_folder=temp_path, wait_time=wait_time)
 
+    if minify_output and not embed_images:
+        logger.info("Precompressed copies are only written for embedded json output, use -b to get them with a zip file.")
+
     if embed_images or both_output:
+        if minify_output:
+            embed_result = minify_json(embed_result)
         logger.info(f"Saving file: {file_name+'.json'}")
-        save_string_to_file(embed_result, file_name+'.json')
+        saved_path = save_string_to_file(embed_result, file_name+'.json')
+        if minify_output:
+            save_precompressed_copies(embed_result, saved_path)
     if both_output or not embed_images:
         assert temp_path is not None
+        if minify_output:
+            download_result = minify_json(download_result)
         save_string_to_file(download_result,'project.json',temp_path)
         logger.info(f"Saving file: {file_name+'.zip'}")
         zip_temp_folder(temp_path, zip_name=file_name+'.zip')
@@ -396,7 +419,7 @@ def clean_url_path_component(encoded_str: str) -> str:
 
     return cleaned_str
 
-def save_string_to_file(content: str, filename: str, path: str = "") -> None:
+def save_string_to_file(content: str, filename: str, path: str = "") -> str:
     """
     Saves a string to a file. The filename is cleaned of invalid characters, 
     and if the file already exists, a number is appended to the filename.
@@ -405,6 +428,9 @@ def save_string_to_file(content: str, filename: str, path: str = "") -> None:
         content (str): The string content to save.
         filename (str): The desired filename.
         path (str, optional): The folder path to save the file into.
+
+    Returns:
+        str: The path of the saved file.
     """
     filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
     base, extension = os.path.splitext(filename)
@@ -425,6 +451,108 @@ def save_string_to_file(content: str, filename: str, path: str = "") -> None:
         file.write(content)
 
     logger.info(f"File saved as: {new_filename}")
+    return new_filename
+
+def minify_json(content: str) -> str:
+    """
+    Parses a JSON string and serializes it again without any whitespace.
+    Key order is preserved and non-ASCII characters are written unescaped.
+
+    Parameters:
+        content (str): The JSON string to minify.
+
+    Returns:
+        str: The minified JSON string, or the original string if it is not valid JSON
+             or cannot be minified without changing its contents.
+    """
+    def reject_duplicate_keys(pairs):
+        keys = [key for key, _ in pairs]
+        if len(keys) != len(set(keys)):
+            raise ValueError(f"Duplicate keys in object: {sorted({key for key in keys if keys.count(key) > 1})}")
+        return dict(pairs)
+
+    try:
+        data = json.loads(content, object_pairs_hook=reject_duplicate_keys)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Project is not valid JSON, skipping minification: {e}")
+        return content
+    except ValueError as e:
+        logger.warning(f"Project cannot be minified without losing data, skipping minification: {e}")
+        return content
+    try:
+        result = json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+    except ValueError as e:
+        logger.warning(f"Project contains values that cannot be written as valid JSON, skipping minification: {e}")
+        return content
+    try:
+        result.encode('utf-8')
+    except UnicodeEncodeError as e:
+        logger.warning(f"Project contains unpaired surrogate escapes, skipping minification: {e}")
+        return content
+    return result
+
+def gzip_compress_parallel(data: bytes, level: int = 9, chunk_size: int = 1024 * 1024) -> bytes:
+    """
+    Gzip compresses data using all CPU cores. The data is split into chunks that
+    are deflated independently, each primed with the preceding 32 KiB as its
+    dictionary, and joined into a single gzip member the same way pigz does.
+
+    Parameters:
+        data (bytes): The data to compress.
+        level (int): The compression level (default is 9).
+        chunk_size (int): The size of each independently compressed chunk in bytes.
+
+    Returns:
+        bytes: The gzip compressed data.
+    """
+    view = memoryview(data)
+    offsets = list(range(0, len(data), chunk_size)) or [0]
+
+    def compress_chunk(offset: int) -> bytes:
+        if offset:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=view[max(0, offset - 32768):offset])
+        else:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        is_last = offset == offsets[-1]
+        return compressor.compress(view[offset:offset + chunk_size]) + compressor.flush(zlib.Z_FINISH if is_last else zlib.Z_SYNC_FLUSH)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        deflated = b''.join(executor.map(compress_chunk, offsets))
+
+    # Gzip header with no timestamp, maximum compression flag and unknown OS
+    header = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'
+    trailer = struct.pack('<II', zlib.crc32(data), len(data) & 0xffffffff)
+    return header + deflated + trailer
+
+def save_precompressed_copies(content: str, file_path: str) -> None:
+    """
+    Writes gzip and brotli compressed copies of a file next to it, so that a
+    static web server can serve them without compressing on each request.
+    Gzip is spread over all cores while brotli runs alongside it on a single
+    core, and the size of each variant is logged. Brotli output is skipped if
+    the brotli package is not installed.
+
+    Parameters:
+        content (str): The file content to compress.
+        file_path (str): The path of the saved uncompressed file.
+    """
+    data = content.encode('utf-8')
+
+    compressors = {'.gz': gzip_compress_parallel}
+    if brotli is not None:
+        compressors['.br'] = lambda d: brotli.compress(d, quality=9)
+    else:
+        logger.warning("brotli package not installed, skipping .br output.")
+
+    with ThreadPoolExecutor(max_workers=len(compressors)) as executor:
+        futures = {ext: executor.submit(compress, data) for ext, compress in compressors.items()}
+        compressed = {ext: future.result() for ext, future in futures.items()}
+
+    logger.info(f"{file_path}: {len(data)} bytes")
+    for ext, compressed_data in compressed.items():
+        with open(file_path + ext, 'wb') as file:
+            file.write(compressed_data)
+        logger.info(f"{file_path + ext}: {len(compressed_data)} bytes")
 
 def process_images(
     input_str: str,
@@ -450,8 +578,10 @@ def process_images(
         tuple[str, str]: A tuple containing two strings:
             - The modified string with base64-encoded image references (if embed is True).
             - The modified string with local image paths (if download is True).
+            Images that are already embedded as data URIs are decoded and
+            written to the images folder when download is True.
     """
-    data_uri_pattern = re.compile(r'^data:image\/[a-zA-Z0-9.+-]+;base64,')
+    data_uri_pattern = re.compile(r'^data:(image\\?\/[a-zA-Z0-9.+-]+);base64,')
 
     if download and not temp_folder:
         raise ValueError("temp_folder must be specified when download is True.")
@@ -467,11 +597,54 @@ def process_images(
     embed_str = input_str
     download_str = input_str
 
+    # Maps the hash of an embedded image payload to its saved filename
+    extracted_images: dict[str, str] = {}
+
+    def extract_embedded_image(match, data_uri_match):
+        mime_type = data_uri_match.group(1).replace('\\/', '/')
+        b64_data = match.group(1)[data_uri_match.end():].replace('\\/', '/')
+        if not b64_data.isascii():
+            logger.warning("Embedded image contains non-base64 characters, keeping it embedded.")
+            return match.group(0)
+        try:
+            image_data = base64.b64decode(b64_data, validate=True)
+        except binascii.Error as e:
+            logger.warning(f"Failed to decode embedded image, keeping it embedded: {e}")
+            return match.group(0)
+
+        digest = hashlib.sha256(image_data).hexdigest()
+        if digest in extracted_images:
+            logger.info(f"Reusing extracted image: images/{extracted_images[digest]}")
+            return f'"image":"images/{extracted_images[digest]}"'
+
+        ext = mimetypes.guess_extension(mime_type)
+        if not ext:
+            ext = '.bin'
+        filename = f"{digest[:16]}{ext}"
+        save_path = os.path.join(images_folder, filename)
+
+        # Avoid overwriting a downloaded image with the same name
+        base = digest[:16]
+        counter = 1
+        while os.path.exists(save_path):
+            filename = f"{base}_{counter}{ext}"
+            save_path = os.path.join(images_folder, filename)
+            counter += 1
+
+        with open(save_path, 'wb') as f:
+            f.write(image_data)
+
+        extracted_images[digest] = filename
+        logger.info(f"Extracted embedded image: {save_path}")
+        return f'"image":"images/{filename}"'
+
     def process_match(match, operation):
         image_path = match.group(1)
-        
 
-        if data_uri_pattern.match(image_path):
+        data_uri_match = data_uri_pattern.match(image_path)
+        if data_uri_match:
+            if operation == 'download':
+                return extract_embedded_image(match, data_uri_match)
             logger.info(f"Skipping already embedded image.")
             return match.group(0)
 